@@ -1,7 +1,7 @@
 # this Python script performs the following tasks:
 #     - Loads and preprocesses a CSV dataset containing episode and character information.
 #     - Calculates total character appearances and lists the most frequently appearing characters.
-#     - Reshapes the data to analyze which characters appear in which episodes and maps episodes to plot groups.
+#     - Builds a character x episode incidence matrix and maps episodes to plot groups.
 #     - Visualizes the appearance arc of a specific character (e.g., "Rose") using a bar plot.
 #     - Identifies top characters for each plot group.
 #     - Computes co-occurrence statistics for character pairs (i.e., how often two characters appear in the same episode).
@@ -9,10 +9,23 @@
 #     - Creates and visualizes a heatmap of co-occurrence counts among the top N most connected characters.
 
 import pandas as pd
-import itertools
 import matplotlib.pyplot as plt
-import seaborn as sns
 import numpy as np
+import scipy.sparse as sp
+
+
+def top_k_indices(values, k):
+    """Return the indices of the k largest values, largest first, without a full sort.
+
+    Ties go to the lower index, so the result does not depend on argpartition's element order.
+    """
+    k = min(k, len(values))
+    if k == 0:
+        return np.array([], dtype=np.intp)
+    kth_largest = -np.partition(-values, k - 1)[k - 1]
+    top = np.flatnonzero(values >= kth_largest)
+    return top[np.lexsort((top, -values[top]))][:k]
+
 
 # === Load data ===
 file_path = "data.csv"
@@ -20,89 +33,133 @@ df = pd.read_csv(file_path)
 
 # === Preprocessing ===
 episode_cols = df.columns[1:]
-df_characters = df[df['episode'] != 'plot'].copy()
-df_characters[episode_cols] = df_characters[episode_cols].apply(pd.to_numeric, errors='coerce').fillna(0)
-df_characters['total_appearances'] = df_characters[episode_cols].sum(axis=1)
-
-# === Reshape for analysis ===
-df_long = df_characters.set_index('episode')[episode_cols].stack().reset_index()
-df_long.columns = ['character', 'episode_id', 'appeared']
-df_long = df_long[df_long['appeared'] > 0]
+# rows without a name (blank padding in the sheet) are not characters
+df_characters = df[(df['episode'] != 'plot') & df['episode'].notna()]
+# coerce the whole episode block in one pass rather than column by column
+episode_values = np.asarray(df_characters[episode_cols].values, dtype=object)
+episode_values = pd.to_numeric(episode_values.ravel(), errors='coerce').reshape(episode_values.shape)
+episode_flags = np.nan_to_num(episode_values) > 0
+# a row repeated verbatim (same name, same credits) lists one character twice, so drop the copies;
+# rows that share a name but differ in credits are different characters and stay separate
+repeated = pd.DataFrame(episode_flags).assign(name=df_characters['episode'].to_numpy()).duplicated().to_numpy()
+df_characters = df_characters[~repeated]
+# the cells are appearance flags, so keep them as a uint8 bitmap; column-major,
+# so the axis=1 sum and the transposed reads below walk contiguous memory
+appear = np.asfortranarray(episode_flags[~repeated], dtype=np.uint8)
+total_appearances = appear.sum(axis=1, dtype=np.int32)
+
+# === Episode incidence matrix ===
+# characters are integer codes from here on, numbered in name order (same-name rows in
+# row order), so sorting codes sorts names; names are only looked up for output
+name_ranks, _ = pd.factorize(df_characters['episode'].to_numpy(), sort=True, use_na_sentinel=False)
+char_order = np.argsort(name_ranks, kind='stable')
+char_names = df_characters['episode'].to_numpy()[char_order]
+# characters x episodes, 1 where the character is credited in the episode
+# (stored column-major so incidence.T, the episodes x characters view, is C-contiguous)
+incidence = np.asfortranarray(appear[char_order])
 
 # === Add plot ID mapping ===
-plot_mapping_series = df[df['episode'] == 'plot'].iloc[0, 1:].astype(float)
-plot_mapping = plot_mapping_series.to_dict()
-df_long['episode_id'] = pd.to_numeric(df_long['episode_id'])
-df_long['plot_id'] = df_long['episode_id'].map(plot_mapping)
+# plot id per episode column, aligned with the columns of the incidence matrix
+plot_ids = df.loc[df['episode'] == 'plot', episode_cols].iloc[0].to_numpy(dtype=float)
+plot_codes, unique_plots = pd.factorize(plot_ids, sort=True)
 
 # === Character Popularity ===
-character_appearances = df_characters[['episode', 'total_appearances']].sort_values(by='total_appearances', ascending=False)
-print("\ntop 10 characters by total appearances:")
-print(character_appearances.head(10))
+top_appearances = top_k_indices(total_appearances, 10)
 
 # === Plot dominance: top characters per plot ===
-plot_character_counts = df_long.groupby(['plot_id', 'character']).size().reset_index(name='appearances_in_plot')
-print("\ntop characters per arc:")
-for plot_id in plot_character_counts['plot_id'].unique():
-    top_chars = plot_character_counts[plot_character_counts['plot_id'] == plot_id].nlargest(3, 'appearances_in_plot')
-    print(f"plot {int(plot_id)}: {', '.join(top_chars['character'])}")
+# characters x plots appearance counts, accumulated in one pass over the credited cells;
+# episodes without a plot id are left out
+char_of_nnz, episode_of_nnz = np.nonzero(incidence)
+plot_of_nnz = plot_codes[episode_of_nnz]
+in_plot = plot_of_nnz >= 0
+plot_character_counts = np.zeros((len(char_names), len(unique_plots)), dtype=np.int32)
+np.add.at(plot_character_counts, (char_of_nnz[in_plot], plot_of_nnz[in_plot]), 1)
+# top 3 characters of every plot at once (one column per plot), largest first. Ranking on
+# count * n + (n - 1 - code) makes every key in a column distinct, so ties on count go to
+# the lower code, i.e. the name that sorts first
+k = min(3, len(char_names))
+n_chars = len(char_names)
+plot_rank_keys = plot_character_counts.astype(np.int64) * n_chars + (n_chars - 1 - np.arange(n_chars))[:, None]
+plot_top_characters = np.argpartition(-plot_rank_keys, k - 1, axis=0)[:k]
+order = np.argsort(-np.take_along_axis(plot_rank_keys, plot_top_characters, axis=0), axis=0)
+plot_top_characters = np.take_along_axis(plot_top_characters, order, axis=0)
+plot_top_counts = np.take_along_axis(plot_character_counts, plot_top_characters, axis=0)
 
 # === Co-occurrence Analysis ===
-episode_character_map = df_long.groupby('episode_id')['character'].apply(list).to_dict()
-co_occurrence_counts = {}
-for characters in episode_character_map.values():
-    for char1, char2 in itertools.combinations(sorted(characters), 2):
-        pair = tuple(sorted((char1, char2)))
-        co_occurrence_counts[pair] = co_occurrence_counts.get(pair, 0) + 1
-
-co_occurrence_df = pd.DataFrame(co_occurrence_counts.items(), columns=['character_pair', 'co_occurrence_count'])
-co_occurrence_df[['character_A', 'character_B']] = pd.DataFrame(co_occurrence_df['character_pair'].tolist(), index=co_occurrence_df.index)
-co_occurrence_df.drop(columns=['character_pair'], inplace=True)
-
-print("\ntop 10 character pair co-occurrences:")
-print(co_occurrence_df.sort_values(by='co_occurrence_count', ascending=False).head(10))
-
-# === Heatmap of top N character co-occurrences ===
+# off-diagonal entries of M.T @ M (M: episodes x characters) are the pair counts
+M = sp.csr_matrix(incidence.T, dtype=np.int32)
+C = (M.T @ M).tocoo()
+C.setdiag(0)
+C.eliminate_zeros()
+
+# each pair once (upper triangle), as parallel arrays of character codes and counts
+upper = C.row < C.col
+pair_a, pair_b, pair_counts = C.row[upper], C.col[upper], C.data[upper]
+# scipy returns the entries in its own storage order; put pairs in code (= name) order so
+# top_k_indices breaks ties on count alphabetically
+pair_order = np.lexsort((pair_b, pair_a))
+pair_a, pair_b, pair_counts = pair_a[pair_order], pair_b[pair_order], pair_counts[pair_order]
+top_pairs = top_k_indices(pair_counts, 10)
+
+# === Top N most connected characters ===
 N_TOP_CHARACTERS = 15
-co_sum = {}
+# per-cell labels are the slow part of drawing the heatmap; skip them past this size
+MAX_ANNOTATED_CHARACTERS = 30
+# C has a zeroed diagonal, so its row sums are each character's total co-occurrence
+co_sum = np.asarray(C.sum(axis=1)).ravel()
+# only characters that share at least one episode with someone are candidates
+connected = np.flatnonzero(co_sum > 0)
+top_idx = connected[top_k_indices(co_sum[connected], N_TOP_CHARACTERS)]
+
+# === Report ===
+# frames are only built here, from the few rows that get printed
+print("\ntop 10 characters by total appearances:")
+print(df_characters[['episode']].iloc[top_appearances].assign(
+    total_appearances=total_appearances[top_appearances]))
 
-for _, row in co_occurrence_df.iterrows():
-    co_sum[row['character_A']] = co_sum.get(row['character_A'], 0) + row['co_occurrence_count']
-    co_sum[row['character_B']] = co_sum.get(row['character_B'], 0) + row['co_occurrence_count']
+print("\ntop characters per arc:")
+for j, plot_id in enumerate(unique_plots):
+    if not plot_top_counts[:, j].any():
+        continue  # no credited character in any of this plot's episodes
+    top = plot_top_characters[plot_top_counts[:, j] > 0, j]
+    print(f"plot {int(plot_id)}: {', '.join(char_names[top])}")
 
-top_characters = sorted(co_sum.items(), key=lambda x: x[1], reverse=True)[:N_TOP_CHARACTERS]
-top_character_names = [char for char, _ in top_characters]
+print("\ntop 10 character pair co-occurrences:")
+print(pd.DataFrame({
+    'co_occurrence_count': pair_counts[top_pairs],
+    'character_A': char_names[pair_a[top_pairs]],
+    'character_B': char_names[pair_b[top_pairs]],
+}))
 
 print(f"\ntop {N_TOP_CHARACTERS} characters by total co-occurrence:")
-for char, count in top_characters:
+for char, count in zip(char_names[top_idx], co_sum[top_idx]):
     print(f"- {char}: {count}")
 
-# Filter for heatmap
-filtered_df = co_occurrence_df[
-    co_occurrence_df['character_A'].isin(top_character_names) &
-    co_occurrence_df['character_B'].isin(top_character_names)
-]
-
-# Pivot for symmetric matrix
-matrix = filtered_df.pivot_table(
-    values='co_occurrence_count',
-    index='character_A',
-    columns='character_B',
-    fill_value=0
-)
-
-ordered_chars = sorted(top_character_names)
-matrix = matrix.reindex(index=ordered_chars, columns=ordered_chars, fill_value=0)
-matrix = matrix + matrix.T
+# === Heatmap of top N character co-occurrences ===
+# Slice the symmetric matrix down to the top characters, in alphabetical order
+heat_idx = np.sort(top_idx)
+heat_dense = C.tocsr()[heat_idx][:, heat_idx].toarray()
+heat_labels = char_names[heat_idx]
 
-# Upper triangle mask
-mask = np.triu(np.ones_like(matrix, dtype=bool))
+# Keep only the strict lower triangle; masked cells are NaN so imshow leaves them blank
+keep_i, keep_j = np.tril_indices(len(heat_idx), k=-1)
+heat_masked = np.full(heat_dense.shape, np.nan)
+heat_masked[keep_i, keep_j] = heat_dense[keep_i, keep_j]
 
 # Plot heatmap
-plt.figure(figsize=(14, 12))
-sns.heatmap(matrix, mask=mask, annot=True, cmap='viridis', fmt='g',
-            linewidths=.5, linecolor='lightgray',
-            cbar_kws={'label': 'co-occurrence count'})
+fig, ax = plt.subplots(figsize=(14, 12))
+# pcolor leaves masked cells out entirely, so cell borders only outline the kept triangle
+im = ax.pcolor(np.ma.masked_invalid(heat_masked), cmap='viridis', edgecolors='lightgray', linewidth=.5)
+ax.set_aspect('equal')
+ax.invert_yaxis()
+fig.colorbar(im, ax=ax, label='co-occurrence count')
+if len(heat_idx) <= MAX_ANNOTATED_CHARACTERS:
+    nonzero = heat_dense[keep_i, keep_j] > 0
+    for i, j in zip(keep_i[nonzero], keep_j[nonzero]):
+        ax.text(j + .5, i + .5, int(heat_dense[i, j]), ha='center', va='center', fontsize=8,
+                color='white' if im.norm(heat_dense[i, j]) < 0.5 else 'black')
+ax.set_xticks(np.arange(len(heat_labels)) + .5, labels=heat_labels)
+ax.set_yticks(np.arange(len(heat_labels)) + .5, labels=heat_labels)
 plt.title(f'character co-occurrence heatmap (top {N_TOP_CHARACTERS})', size=18)
 plt.xlabel('character', size=14)
 plt.ylabel('character', size=14)